@@ -1,33 +1,87 @@
 #!/usr/bin/env python3
 """Generate interactive Plotly HTML visualisations from poll_data.csv.
 
-Creates `polls.html` in the same folder. Uses `plotly` and `pandas`.
+Creates `polls.html` in the same folder. Uses `plotly`, `pandas` and `pyarrow`.
 """
+import argparse
+import hashlib
 from pathlib import Path
+from typing import Optional
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pacsv
 from plotly.subplots import make_subplots
 import plotly.graph_objs as go
-from plotly.offline import plot
+import plotly.io as pio
 
+# serialise figures with orjson (NumPy-aware, much faster than the stdlib encoder)
+pio.json.config.default_engine = "orjson"
 
 DATA_FILE = Path(__file__).parent / "poll_data.csv"
 OUT_FILE = Path(__file__).parent / "polls.html"
+# digest of the inputs polls.html was last built from
+HASH_FILE = OUT_FILE.with_suffix(".sha256")
+# polls shown in the main panel; load_data stops parsing after this many valid rows
+TOP_N = 50
+# columns make_figure needs from poll_data.csv or a scraped table
+COLUMNS = ["pollster", "date", "approve", "disapprove"]
+READ_BLOCK_SIZE = 16 * 1024
 BRAND_IMG = "https://www.logolounge.com/wp-content/uploads/2025/10/newsweek-wordmark-new-1024x253.png"
 
 
-def load_data(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    # keep only numeric approve/disapprove
-    df = df.dropna(subset=["approve", "disapprove"]).copy()
-    df["approve"] = pd.to_numeric(df["approve"], errors="coerce")
-    df["disapprove"] = pd.to_numeric(df["disapprove"], errors="coerce")
-    df = df.dropna(subset=["approve", "disapprove"]) 
+def load_data(path: Path, max_rows: Optional[int] = None) -> pd.DataFrame:
+    # only the columns make_figure uses; sample/spread are never materialised.
+    # everything is read as text so stray non-numeric cells don't abort the parse
+    # and streamed blocks can't disagree on inferred types
+    convert_options = pacsv.ConvertOptions(
+        include_columns=COLUMNS,
+        column_types={"pollster": pa.string(), "date": pa.string(),
+                      "approve": pa.string(), "disapprove": pa.string()},
+    )
+    if max_rows is None:
+        return frame_from_table(pacsv.read_csv(path, convert_options=convert_options))
+
+    # rows are most-recent first: stream small blocks and stop parsing once
+    # enough valid rows have been seen
+    read_options = pacsv.ReadOptions(block_size=READ_BLOCK_SIZE)
+    frames = []
+    n_valid = 0
+    with pacsv.open_csv(path, read_options=read_options, convert_options=convert_options) as reader:
+        for batch in reader:
+            frame = frame_from_table(pa.Table.from_batches([batch]))
+            frames.append(frame)
+            n_valid += len(frame)
+            if n_valid >= max_rows:
+                break
+        if not frames:
+            return frame_from_table(reader.schema.empty_table())
+    df = pd.concat(frames, ignore_index=True)
+    return df.head(max_rows)
+
+
+def frame_from_table(table: pa.Table) -> pd.DataFrame:
+    """Turn a table of scraped poll columns into the frame make_figure expects."""
+    cols = ["approve", "disapprove"]
+    df = table.select(COLUMNS).to_pandas()
+    # keep only numeric approve/disapprove: coerce both in one pass, then drop once
+    df[cols] = df[cols].apply(pd.to_numeric, errors="coerce", downcast="float")
+    df.dropna(subset=cols, inplace=True)
     return df
 
 
+def rolling_mean(values, window: int) -> np.ndarray:
+    """Trailing mean over `window` points, like `rolling(window, min_periods=1).mean()`."""
+    csum = np.cumsum(np.concatenate(([0.0], values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    return (csum[end] - csum[start]) / (end - start)
+
+
 def make_figure(df: pd.DataFrame):
-    top50 = df.head(50).reset_index(drop=True)
-    top10 = df.head(10).reset_index(drop=True)
+    # positional slices only; the index is never used by label
+    top50 = df.head(TOP_N)
+    top10 = top50.head(10)
 
     fig = make_subplots(rows=3, cols=1, shared_xaxes=True,
                         row_heights=[0.55, 0.30, 0.15],
@@ -36,28 +90,33 @@ def make_figure(df: pd.DataFrame):
                                         "Most Recent 10 Polls",
                                         "Rolling average (window=3) — most recent 10 polls"))
 
-    x50 = top50["pollster"] + " — " + top50["date"]
-    x10 = top10["pollster"] + " — " + top10["date"]
-
-    fig.add_trace(go.Scatter(x=x50, y=top50["approve"], mode="lines+markers",
-                             name="Approve", line=dict(color="#1f77b4")), row=1, col=1)
-    fig.add_trace(go.Scatter(x=x50, y=top50["disapprove"], mode="lines+markers",
-                             name="Disapprove", line=dict(color="#d62728")), row=1, col=1)
-
-    fig.add_trace(go.Scatter(x=x10, y=top10["approve"], mode="lines+markers",
-                             name="Approve (last 10)", line=dict(color="#1f77b4")), row=2, col=1)
-    fig.add_trace(go.Scatter(x=x10, y=top10["disapprove"], mode="lines+markers",
-                             name="Disapprove (last 10)", line=dict(color="#d62728")), row=2, col=1)
+    # build the labels once; the last-10 panels reuse the first 10
+    x50 = np.array([f"{pollster} — {date}"
+                    for pollster, date in zip(top50["pollster"].to_numpy(), top50["date"].to_numpy())],
+                   dtype=object)
+    x10 = x50[:10]
 
     # rolling average for top10
     roll_window = 3
-    r_approve = top10["approve"].rolling(window=roll_window, min_periods=1).mean()
-    r_disapprove = top10["disapprove"].rolling(window=roll_window, min_periods=1).mean()
-
-    fig.add_trace(go.Scatter(x=x10, y=r_approve, mode="lines+markers",
-                             name=f"Approve {roll_window}-pt rolling avg", line=dict(color="#1f77b4")), row=3, col=1)
-    fig.add_trace(go.Scatter(x=x10, y=r_disapprove, mode="lines+markers",
-                             name=f"Disapprove {roll_window}-pt rolling avg", line=dict(color="#d62728")), row=3, col=1)
+    r_approve = rolling_mean(top10["approve"].to_numpy(), roll_window)
+    r_disapprove = rolling_mean(top10["disapprove"].to_numpy(), roll_window)
+
+    traces = [
+        go.Scattergl(x=x50, y=top50["approve"], mode="lines+markers",
+                     name="Approve", line=dict(color="#1f77b4")),
+        go.Scattergl(x=x50, y=top50["disapprove"], mode="lines+markers",
+                     name="Disapprove", line=dict(color="#d62728")),
+        go.Scattergl(x=x10, y=top10["approve"], mode="lines+markers",
+                     name="Approve (last 10)", line=dict(color="#1f77b4")),
+        go.Scattergl(x=x10, y=top10["disapprove"], mode="lines+markers",
+                     name="Disapprove (last 10)", line=dict(color="#d62728")),
+        go.Scattergl(x=x10, y=r_approve, mode="lines+markers",
+                     name=f"Approve {roll_window}-pt rolling avg", line=dict(color="#1f77b4")),
+        go.Scattergl(x=x10, y=r_disapprove, mode="lines+markers",
+                     name=f"Disapprove {roll_window}-pt rolling avg", line=dict(color="#d62728")),
+    ]
+    # add all six traces in one call (one validation pass): two per subplot row
+    fig.add_traces(traces, rows=[1, 1, 2, 2, 3, 3], cols=[1] * 6)
 
     fig.update_layout(height=900, width=1200,
                       title_text="Donald Trump Approval — Newsweek",
@@ -86,21 +145,78 @@ def make_figure(df: pd.DataFrame):
     return fig
 
 
+def inputs_digest() -> str:
+    """SHA-256 over the CSV and this script, so code changes also trigger a rebuild.
+
+    scrape_polls.py and the installed plotly version are deliberately not part of
+    the key: the CSV already captures the scraper's output, and a plotly upgrade
+    needs a forced rebuild (delete polls.sha256).
+
+    Hashing streams the whole CSV from disk, so every run still reads all of
+    poll_data.csv once; only load_data's parse stops after the first TOP_N rows.
+    """
+    with open(DATA_FILE, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256")
+    digest.update(Path(__file__).read_bytes())
+    return digest.hexdigest()
+
+
 def main():
     if not DATA_FILE.exists():
         print(f"Data file not found: {DATA_FILE}")
         return
-    df = load_data(DATA_FILE)
+    digest = inputs_digest()
+    if OUT_FILE.exists() and HASH_FILE.exists() and HASH_FILE.read_text().strip() == digest:
+        print(f"Up to date: {OUT_FILE}")
+        return
+    df = load_data(DATA_FILE, max_rows=TOP_N)
     if df.empty:
         print("No valid rows found in CSV.")
         return
 
-    fig = make_figure(df)
+    write_html(make_figure(df))
+    HASH_FILE.write_text(digest + "\n")
 
-    # write HTML with plotly.js loaded from CDN and the image reference
-    plot(fig, filename=str(OUT_FILE), auto_open=False, include_plotlyjs='cdn')
+
+def write_html(fig) -> None:
+    # write HTML with plotly.js loaded from CDN and the image reference;
+    # the figure was built from validated traces, so skip re-validation here
+    OUT_FILE.write_text(fig.to_html(include_plotlyjs="cdn", validate=False, auto_play=False),
+                        encoding="utf-8")
     print(f"Wrote: {OUT_FILE}")
 
 
+def run_pipeline(html_file: Path) -> None:
+    """Scrape polls from `html_file` and plot them in-process, without poll_data.csv."""
+    # only the pipeline needs the scraper; plain CSV plotting skips the import
+    import scrape_polls
+
+    headers, rows = scrape_polls.extract_poll_table(html_file)
+    if not rows:
+        print("No poll data found in the HTML file.")
+        return
+    # the bs4 table fallback can return any headers; each needed column must appear once
+    missing = [col for col in COLUMNS if headers.count(col) != 1]
+    if missing:
+        print(f"No usable poll data found in the HTML file (missing or duplicate columns: {', '.join(missing)}).")
+        return
+    df = frame_from_table(scrape_polls.rows_to_table(headers, rows))
+    if df.empty:
+        print("No valid rows found in the scraped polls.")
+        return
+
+    write_html(make_figure(df))
+    # polls.html no longer reflects poll_data.csv; make the next plain run rebuild it
+    HASH_FILE.unlink(missing_ok=True)
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scrape", metavar="HTML", type=Path,
+                        help="scrape polls from this HTML page and plot them directly, "
+                             "skipping poll_data.csv")
+    args = parser.parse_args()
+    if args.scrape:
+        run_pipeline(args.scrape)
+    else:
+        main()